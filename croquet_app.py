@@ -1,13 +1,17 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import psycopg2
+from psycopg2.extras import execute_values
+from psycopg2.pool import ThreadedConnectionPool
 import csv
+import io
 import os
+import threading
+from contextlib import contextmanager
 from datetime import datetime
-from collections import Counter
-import uuid
 import logging
-import heapq
+import xlsxwriter
 
 # --------------------------------------------------------------------------- #
 # Logging
@@ -18,12 +22,55 @@ logger = logging.getLogger(__name__)
 # --------------------------------------------------------------------------- #
 # DB connection – uses DATABASE_URL (Render/Supavisor)
 # --------------------------------------------------------------------------- #
-def get_connection():
+POOL_MAX_CONN = 10
+
+@st.cache_resource(show_spinner=False)
+def _connection_pool(url):
+    # Shared by every session/rerun, so the TLS handshake to the pooler is not
+    # repeated per call. The semaphore makes callers past POOL_MAX_CONN wait
+    # instead of getting PoolError.
+    pool = ThreadedConnectionPool(1, POOL_MAX_CONN, url, sslmode="require")
+    return pool, threading.BoundedSemaphore(POOL_MAX_CONN)
+
+def _database_url():
     url = os.getenv("DATABASE_URL")
     if not url:
         st.error("DATABASE_URL not set! Add it in **Environment** (Render).")
         raise RuntimeError("DATABASE_URL not set")
-    return psycopg2.connect(url, sslmode="require")
+    return url
+
+def _is_alive(conn):
+    # conn.closed is only set after a failed operation, so a connection the
+    # pooler dropped while idle still looks open – ping it (autocommit, so
+    # the ping opens no transaction).
+    if conn.closed:
+        return False
+    try:
+        conn.autocommit = True
+        with conn.cursor() as c:
+            c.execute("SELECT 1")
+        conn.autocommit = False
+        return True
+    except psycopg2.Error:
+        return False
+
+@contextmanager
+def pooled_connection():
+    # Hands the connection back to the pool it came from, even if "Clear
+    # cache" has replaced the cached pool while it was out.
+    pool, slots = _connection_pool(_database_url())
+    slots.acquire()
+    try:
+        conn = pool.getconn()
+        while not _is_alive(conn):
+            pool.putconn(conn, close=True)
+            conn = pool.getconn()
+        try:
+            yield conn
+        finally:
+            pool.putconn(conn, close=bool(conn.closed))
+    finally:
+        slots.release()
 
 def init_schema(conn):
     cur = conn.cursor()
@@ -63,11 +110,32 @@ def init_schema(conn):
                 FOREIGN KEY (tournament_id) REFERENCES tournaments(id) ON DELETE CASCADE
             );
         """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS standings (
+                tournament_id   INTEGER NOT NULL,
+                rank            INTEGER NOT NULL,
+                player_id       INTEGER NOT NULL,
+                name            TEXT    NOT NULL,
+                points          INTEGER DEFAULT 0,
+                wins            INTEGER DEFAULT 0,
+                net             INTEGER DEFAULT 0,
+                scored          INTEGER DEFAULT 0,
+                conceded        INTEGER DEFAULT 0,
+                planned_games   INTEGER DEFAULT 0,
+                played_results  INTEGER DEFAULT 0,
+                win_pct         REAL    DEFAULT 0,
+                PRIMARY KEY (tournament_id, rank),
+                FOREIGN KEY (tournament_id) REFERENCES tournaments(id) ON DELETE CASCADE
+            );
+        """)
         cur.execute("""
             ALTER TABLE players 
             ADD COLUMN IF NOT EXISTS planned_games INTEGER DEFAULT 0,
             ADD COLUMN IF NOT EXISTS played_results INTEGER DEFAULT 0;
         """)
+        # players/matches/standings are looked up by their primary keys, which
+        # already lead with tournament_id. Saving looks tournaments up by name.
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_tournaments_name ON tournaments (name, id);")
         conn.commit()
         logger.info("DB schema ensured")
     except Exception as e:
@@ -77,10 +145,21 @@ def init_schema(conn):
     finally:
         cur.close()
 
+@st.cache_resource(show_spinner=False)
+def ensure_schema():
+    # The DDL only has to run once per process, not on every rerun. A failure
+    # raises and is not cached, so the next rerun tries again.
+    with pooled_connection() as conn:
+        init_schema(conn)
+
 # --------------------------------------------------------------------------- #
 # Model classes
 # --------------------------------------------------------------------------- #
 class Player:
+    # No per-instance __dict__: one Player per entrant and one Match per
+    # pairing live in session_state for the whole session.
+    __slots__ = ("id", "name", "points", "wins", "hoops_scored", "hoops_conceded")
+
     def __init__(self, id, name):
         self.id = id
         self.name = name
@@ -88,45 +167,59 @@ class Player:
         self.wins = 0
         self.hoops_scored = 0
         self.hoops_conceded = 0
-        self.opponents = set()
-
-    def add_opponent(self, opponent_id):
-        self.opponents.add(opponent_id)
 
 class Match:
+    __slots__ = ("player1", "player2", "result")
+
     def __init__(self, player1, player2):
         self.player1 = player1
         self.player2 = player2
         self.result = None
 
-    def set_result(self, hoops1, hoops2):
-        hoops1, hoops2 = int(hoops1), int(hoops2)
-        if self.player2 is None:  # bye
-            self.result = (hoops1, hoops2)
-            return
-
-        self.player1.hoops_scored   += hoops1
-        self.player1.hoops_conceded += hoops2
-        self.player2.hoops_scored   += hoops2
-        self.player2.hoops_conceded += hoops1
-
-        if hoops1 > hoops2:
-            self.player1.wins   += 1
-            self.player1.points += 1
-        elif hoops2 > hoops1:
-            self.player2.wins   += 1
-            self.player2.points += 1
-
-        self.result = (hoops1, hoops2)
-
     def get_scores(self):
         return self.result if self.result else (0, 0)
 
 # --------------------------------------------------------------------------- #
 # UNIVERSAL SWISS TOURNAMENT
 # --------------------------------------------------------------------------- #
+# Not lru_cache: `streamlit run` re-executes this module on every rerun.
+@st.cache_resource(show_spinner=False, max_entries=64)
+def _pairing_schedule(n, num_rounds):
+    """Pairings for every round by player index, depending only on the field
+    size and round count. Each round is a tuple of (i, j) pairs, with
+    (i, None) for a bye.
+
+    Rounds follow the circle (Berger) method: an odd field gets a virtual
+    bye seat, seat 0 stays fixed and the others rotate one place per round.
+    Every round seats the whole field, no pair meets twice, and after m-1
+    rounds (m = field size rounded up to even) everyone has met everyone
+    once, with one bye each for an odd field. Any rounds beyond that have no
+    unplayed pair left and stay empty."""
+    m = n + n % 2
+    # Seat order makes round 1 the fold (i vs n-1-i, middle player byes).
+    seats = list(range(n // 2)) + [None] * (n % 2) + list(range(n // 2, n))
+    rounds = []
+    for rnd in range(num_rounds):
+        if rnd >= m - 1:
+            rounds.append(())
+            continue
+        pairs, bye = [], None
+        for i in range(m // 2):
+            a, b = seats[i], seats[m - 1 - i]
+            if a is None or b is None:
+                bye = b if a is None else a
+            else:
+                pairs.append((min(a, b), max(a, b)))
+        round_pairs = sorted(pairs)
+        if bye is not None:
+            round_pairs.append((bye, None))
+        rounds.append(tuple(round_pairs))
+        seats = [seats[0], seats[-1]] + seats[1:-1]
+
+    return tuple(rounds)
+
 class SwissTournament:
-    def __init__(self, players_names_or_objects, num_rounds):
+    def __init__(self, players_names_or_objects, num_rounds, schedule=True):
         if all(isinstance(p, str) for p in players_names_or_objects):
             self.players = [Player(i, name) for i, name in enumerate(players_names_or_objects)]
         else:
@@ -135,139 +228,97 @@ class SwissTournament:
         self.n = len(self.players)
         self.num_rounds = num_rounds
         self.rounds = []
-        self.opponents = {p.id: set() for p in self.players}
-        self.games_played = {p.id: 0 for p in self.players}
-        self.bye_count = {p.id: 0 for p in self.players}
-        self.planned_games = {p.id: 0 for p in self.players}
-        self.games_played_with_result = {p.id: 0 for p in self.players}
+        ids = [p.id for p in self.players]
+        self.planned_games = dict.fromkeys(ids, 0)
+        self.games_played_with_result = dict.fromkeys(ids, 0)
+        self.version = 0  # bumped whenever player stats change
 
-        self._generate_all_rounds()
-
-    def _get_next_bye_player(self, used):
-        candidates = [p for p in self.players if p.id not in used]
-        if not candidates:
-            return None
-        candidates.sort(key=lambda p: (self.bye_count[p.id], self.games_played[p.id], p.id))
-        return candidates[0]
+        # A loaded tournament brings its own rounds from the DB, so skip
+        # building (and then discarding) a fresh schedule for it.
+        if schedule:
+            self._generate_all_rounds()
 
     def _generate_all_rounds(self):
-        n = self.n
-        is_even = n % 2 == 0
-
-        # --- Round 1 ---
-        first_round = []
-        used = set()
-
-        if is_even:
-            for i in range(n // 2):
-                p1 = self.players[i]
-                p2 = self.players[n - 1 - i]
-                first_round.append(Match(p1, p2))
-                self.opponents[p1.id].add(p2.id)
-                self.opponents[p2.id].add(p1.id)
-                self.games_played[p1.id] += 1
-                self.games_played[p2.id] += 1
-                self.planned_games[p1.id] += 1
-                self.planned_games[p2.id] += 1
-                used.update([p1.id, p2.id])
-        else:
-            for i in range(n // 2):
+        for schedule in _pairing_schedule(self.n, self.num_rounds):
+            round_matches = []
+            for i, j in schedule:
                 p1 = self.players[i]
-                p2 = self.players[n - 1 - i]
-                first_round.append(Match(p1, p2))
-                self.opponents[p1.id].add(p2.id)
-                self.opponents[p2.id].add(p1.id)
-                self.games_played[p1.id] += 1
-                self.games_played[p2.id] += 1
+                if j is None:
+                    round_matches.append(Match(p1, None))
+                    continue
+                p2 = self.players[j]
+                round_matches.append(Match(p1, p2))
                 self.planned_games[p1.id] += 1
                 self.planned_games[p2.id] += 1
-                used.update([p1.id, p2.id])
-            bye_player = self._get_next_bye_player(used)
-            if bye_player:
-                first_round.append(Match(bye_player, None))
-                self.bye_count[bye_player.id] += 1
-                used.add(bye_player.id)
-
-        self.rounds.append(first_round)
-
-        # --- Rounds 2+ ---
-        for rnd in range(1, self.num_rounds):
-            round_matches = []
-            used = set()
-
-            heap = []
-            for p in self.players:
-                if p.id not in used:
-                    heapq.heappush(heap, (self.games_played[p.id], p.id))
-
-            while len(heap) >= 2:
-                _, id1 = heapq.heappop(heap)
-                p1 = next(p for p in self.players if p.id == id1)
-
-                best_p2 = None
-                best_score = float('inf')
-                best_id2 = None
-                for _, id2 in heap:
-                    p2 = next(p for p in self.players if p.id == id2)
-                    if p2.id in self.opponents[p1.id]:
-                        continue
-                    score = self.games_played[p2.id]
-                    if score < best_score:
-                        best_score = score
-                        best_p2 = p2
-                        best_id2 = id2
-
-                if best_p2:
-                    heap = [x for x in heap if x[1] != best_id2]
-                    heapq.heapify(heap)
-
-                    round_matches.append(Match(p1, best_p2))
-                    self.opponents[p1.id].add(best_p2.id)
-                    self.opponents[best_p2.id].add(p1.id)
-                    self.games_played[p1.id] += 1
-                    self.games_played[best_p2.id] += 1
-                    self.planned_games[p1.id] += 1
-                    self.planned_games[best_p2.id] += 1
-                    used.update([p1.id, best_p2.id])
-                else:
-                    break
-
-            if not is_even and len(used) < n:
-                bye_player = self._get_next_bye_player(used)
-                if bye_player:
-                    round_matches.append(Match(bye_player, None))
-                    self.bye_count[bye_player.id] += 1
-
             self.rounds.append(round_matches)
 
     def record_result(self, round_num, match_num, hoops1, hoops2):
         if not (0 <= round_num < len(self.rounds) and 0 <= match_num < len(self.rounds[round_num])):
             return
         match = self.rounds[round_num][match_num]
-        old1, old2 = match.get_scores()
+        hoops1, hoops2 = int(hoops1), int(hoops2)
+        if match.result == (hoops1, hoops2):
+            return  # re-submitting the same score is a no-op
+        if match.player2 is None:  # bye
+            match.result = (hoops1, hoops2)
+            return
 
-        if match.result and match.player2:
-            if old1 > 0 or old2 > 0:
-                self.games_played_with_result[match.player1.id] -= 1
-                self.games_played_with_result[match.player2.id] -= 1
-
-        if match.result and match.player2:
-            match.player1.hoops_scored   -= old1
-            match.player1.hoops_conceded -= old2
-            match.player2.hoops_scored   -= old2
-            match.player2.hoops_conceded -= old1
-            if old1 > old2:
-                match.player1.wins   -= 1
-                match.player1.points -= 1
-            elif old2 > old1:
-                match.player2.wins   -= 1
-                match.player2.points -= 1
-
-        match.set_result(hoops1, hoops2)
-
-        if match.player2 and (hoops1 > 0 or hoops2 > 0):
-            self.games_played_with_result[match.player1.id] += 1
-            self.games_played_with_result[match.player2.id] += 1
+        # Apply only the difference between the old and the new score
+        # instead of backing the old result out and replaying the new one.
+        old1, old2 = match.get_scores()
+        p1, p2 = match.player1, match.player2
+        d1, d2 = hoops1 - old1, hoops2 - old2
+        p1.hoops_scored   += d1
+        p1.hoops_conceded += d2
+        p2.hoops_scored   += d2
+        p2.hoops_conceded += d1
+
+        # Win deltas are -1/0/+1 per player (bools subtract as ints).
+        w1 = (hoops1 > hoops2) - (old1 > old2)
+        w2 = (hoops2 > hoops1) - (old2 > old1)
+        p1.wins += w1; p1.points += w1
+        p2.wins += w2; p2.points += w2
+
+        played = (hoops1 > 0 or hoops2 > 0) - (old1 > 0 or old2 > 0)
+        if played:
+            self.games_played_with_result[p1.id] += played
+            self.games_played_with_result[p2.id] += played
+
+        match.result = (hoops1, hoops2)
+        self.version += 1
+
+    def recalculate(self, results):
+        """Rebuild all player stats from (round_num, match_num, hoops1, hoops2)
+        rows in one vectorised pass instead of replaying each match."""
+        index = {p.id: i for i, p in enumerate(self.players)}
+        rows = []
+        for r, m, h1, h2 in results:
+            match = self.rounds[r][m]
+            if not match or not match.player2:
+                continue
+            match.result = (int(h1), int(h2))
+            rows.append((index[match.player1.id], index[match.player2.id]) + match.result)
+
+        i1, i2, h1, h2 = (np.array(col, dtype=np.int64) for col in zip(*rows)) if rows \
+            else (np.zeros(0, dtype=np.int64),) * 4
+        n = len(self.players)
+        scored, conceded, wins, played = (np.zeros(n, dtype=np.int64) for _ in range(4))
+        np.add.at(scored, i1, h1)
+        np.add.at(scored, i2, h2)
+        np.add.at(conceded, i1, h2)
+        np.add.at(conceded, i2, h1)
+        np.add.at(wins, i1[h1 > h2], 1)
+        np.add.at(wins, i2[h2 > h1], 1)
+        has_result = (h1 > 0) | (h2 > 0)
+        np.add.at(played, i1[has_result], 1)
+        np.add.at(played, i2[has_result], 1)
+
+        for i, p in enumerate(self.players):
+            p.points = p.wins = int(wins[i])
+            p.hoops_scored = int(scored[i])
+            p.hoops_conceded = int(conceded[i])
+        self.games_played_with_result = {p.id: int(played[i]) for i, p in enumerate(self.players)}
+        self.version += 1
 
     def get_standings(self):
         return sorted(
@@ -282,160 +333,166 @@ class SwissTournament:
 # --------------------------------------------------------------------------- #
 # DB helpers
 # --------------------------------------------------------------------------- #
-def get_db_mtime():
-    return datetime.now().timestamp()
+# Rows per multi-VALUES INSERT. execute_values inlines the literals, so there
+# is no bind-parameter cap; this just keeps a whole tournament to one
+# statement per table (the psycopg2 default of 100 splits larger fields).
+INSERT_PAGE_SIZE = 1000
+
+def _standings_rows(tid, tournament):
+    # One row per player in ranking order; `played` is needed twice per row.
+    for rank, p in enumerate(tournament.get_standings(), 1):
+        played = tournament.games_played_with_result.get(p.id, 0)
+        yield (tid, rank, p.id, p.name, p.points, p.wins, p.hoops_scored - p.hoops_conceded,
+               p.hoops_scored, p.hoops_conceded, tournament.planned_games.get(p.id, 0), played,
+               round(p.wins / played * 100, 1) if played else 0.0)
 
 def save_to_db(tournament, tournament_name):
-    conn = get_connection()
     try:
-        c = conn.cursor()
-        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        c.execute("SELECT id FROM tournaments WHERE name=%s", (tournament_name,))
-        row = c.fetchone()
-        if row:
-            tid = row[0]
-            c.execute("DELETE FROM players WHERE tournament_id=%s", (tid,))
-            c.execute("DELETE FROM matches WHERE tournament_id=%s", (tid,))
-            c.execute("UPDATE tournaments SET name=%s, date=%s WHERE id=%s", (tournament_name, now, tid))
-        else:
-            c.execute("INSERT INTO tournaments (name,date) VALUES (%s,%s) RETURNING id", (tournament_name, now))
-            tid = c.fetchone()[0]
-
-        c.executemany(
-            "INSERT INTO players (tournament_id,player_id,name,points,wins,hoops_scored,hoops_conceded,planned_games,played_results) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)",
-            [(tid, p.id, p.name, p.points, p.wins, p.hoops_scored, p.hoops_conceded,
-              tournament.planned_games.get(p.id, 0),
-              tournament.games_played_with_result.get(p.id, 0)) for p in tournament.players]
-        )
-
-        match_rows = []
-        for r, rnd in enumerate(tournament.rounds):
-            for m, match in enumerate(rnd):
-                if not match: continue
-                h1, h2 = match.get_scores()
-                p2id = match.player2.id if match.player2 else -1
-                match_rows.append((tid, r, m, match.player1.id, p2id, h1, h2))
-        c.executemany(
-            "INSERT INTO matches (tournament_id,round_num,match_num,player1_id,player2_id,hoops1,hoops2) VALUES (%s,%s,%s,%s,%s,%s,%s)",
-            match_rows
-        )
-        conn.commit()
-        st.cache_data.clear()
+        with pooled_connection() as conn:
+            # One transaction per save: a failure leaves no half-written rows.
+            with conn, conn.cursor() as c:
+                now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                # Lock the tournament row first: a concurrent re-save of the
+                # same name blocks here until this one commits, and its DELETEs
+                # then run with a fresh snapshot and see our inserted rows.
+                c.execute("SELECT id FROM tournaments WHERE name=%s ORDER BY id LIMIT 1 FOR UPDATE", (tournament_name,))
+                row = c.fetchone()
+                if row:
+                    tid = row[0]
+                    c.execute("""
+                        UPDATE tournaments SET date=%(date)s WHERE id=%(tid)s;
+                        DELETE FROM players   WHERE tournament_id=%(tid)s;
+                        DELETE FROM matches   WHERE tournament_id=%(tid)s;
+                        DELETE FROM standings WHERE tournament_id=%(tid)s;
+                    """, {"tid": tid, "date": now})
+                else:
+                    c.execute("INSERT INTO tournaments (name,date) VALUES (%s,%s) RETURNING id", (tournament_name, now))
+                    tid = c.fetchone()[0]
+
+                # execute_values sends each table as multi-row INSERTs instead
+                # of executemany's one round trip per row.
+                execute_values(
+                    c,
+                    "INSERT INTO players (tournament_id,player_id,name,points,wins,hoops_scored,hoops_conceded,planned_games,played_results) VALUES %s",
+                    ((tid, p.id, p.name, p.points, p.wins, p.hoops_scored, p.hoops_conceded,
+                      tournament.planned_games.get(p.id, 0),
+                      tournament.games_played_with_result.get(p.id, 0)) for p in tournament.players),
+                    page_size=INSERT_PAGE_SIZE
+                )
+
+                # Rows are fed from a generator; execute_values pulls one page
+                # at a time, so the full row list is never materialised.
+                execute_values(
+                    c,
+                    "INSERT INTO matches (tournament_id,round_num,match_num,player1_id,player2_id,hoops1,hoops2) VALUES %s",
+                    ((tid, r, m, match.player1.id, match.player2.id if match.player2 else -1, *match.get_scores())
+                     for r, rnd in enumerate(tournament.rounds)
+                     for m, match in enumerate(rnd) if match),
+                    page_size=INSERT_PAGE_SIZE
+                )
+
+                execute_values(
+                    c,
+                    "INSERT INTO standings (tournament_id,rank,player_id,name,points,wins,net,scored,conceded,planned_games,played_results,win_pct) VALUES %s",
+                    _standings_rows(tid, tournament),
+                    page_size=INSERT_PAGE_SIZE
+                )
+        load_tournaments_list.clear()
         logger.info(f"Saved tournament {tid}")
         return tid
     except Exception as e:
         logger.error(f"Save error: {e}")
         st.error(f"Save error: {e}")
-        conn.rollback()
         return None
-    finally:
-        conn.close()
 
 def delete_tournament_from_db(tournament_id):
-    conn = get_connection()
     try:
-        c = conn.cursor()
-        c.execute("DELETE FROM players WHERE tournament_id=%s", (tournament_id,))
-        c.execute("DELETE FROM matches WHERE tournament_id=%s", (tournament_id,))
-        c.execute("DELETE FROM tournaments WHERE id=%s", (tournament_id,))
-        conn.commit()
-        st.cache_data.clear()
+        with pooled_connection() as conn:
+            with conn, conn.cursor() as c:
+                c.execute("""
+                    DELETE FROM players     WHERE tournament_id=%(tid)s;
+                    DELETE FROM matches     WHERE tournament_id=%(tid)s;
+                    DELETE FROM standings   WHERE tournament_id=%(tid)s;
+                    DELETE FROM tournaments WHERE id=%(tid)s;
+                """, {"tid": tournament_id})
+        load_tournaments_list.clear()
         return True
     except Exception as e:
         logger.error(f"Delete error: {e}")
         st.error(f"Delete error: {e}")
         return False
-    finally:
-        conn.close()
 
 @st.cache_data(show_spinner="Loading tournament list…")
-def load_tournaments_list(_db_mtime, _cache_buster=str(uuid.uuid4())):
-    try:
-        conn = get_connection()
+def load_tournaments_list():
+    # Errors propagate: st.cache_data does not cache an exception, so a
+    # transient DB failure is retried on the next rerun instead of pinning [].
+    with pooled_connection() as conn:
         c = conn.cursor()
-        c.execute("SELECT id, name, date FROM tournaments ORDER BY date DESC")
+        c.execute("""
+            SELECT id, name, date, COUNT(*) OVER (PARTITION BY name) AS name_cnt
+            FROM tournaments ORDER BY date DESC
+        """)
         rows = c.fetchall()
-        conn.close()
-        if not rows: return []
-        name_cnt = Counter(r[1] for r in rows)
-        out = []
-        for tid, name, date in rows:
-            disp = name if name_cnt[name] == 1 else f"{name} ({date.split(' ')[0]})"
-            out.append((tid, disp))
-        return out
-    except Exception as e:
-        logger.error(f"Load list error: {e}")
-        st.error(f"Load list error: {e}")
-        return []
+    if not rows: return []
+    out = []
+    for tid, name, date, cnt in rows:
+        disp = name if cnt == 1 else f"{name} ({date.split(' ')[0]})"
+        out.append((tid, disp))
+    return out
 
 def load_tournament_data(tournament_id):
-    conn = get_connection()
     try:
-        c = conn.cursor()
-        c.execute("SELECT name FROM tournaments WHERE id=%s", (tournament_id,))
-        tname = c.fetchone()
-        if not tname: return None, None, None
-        tname = tname[0]
-
-        c.execute("SELECT player_id, name, points, wins, hoops_scored, hoops_conceded, planned_games, played_results FROM players WHERE tournament_id=%s ORDER BY player_id", (tournament_id,))
-        player_rows = c.fetchall()
-        player_map = {}
-        for pid, name, pts, wins, hs, hc, planned, played in player_rows:
-            p = Player(pid, name)
-            p.points = pts; p.wins = wins; p.hoops_scored = hs; p.hoops_conceded = hc
-            player_map[pid] = p
-
-        c.execute("SELECT MAX(round_num) FROM matches WHERE tournament_id=%s", (tournament_id,))
-        max_r = c.fetchone()[0]
-        num_rounds = (max_r + 1) if max_r is not None else 1
-
-        tournament = SwissTournament(list(player_map.values()), num_rounds)
-        tournament.planned_games = {pid: planned for pid, _, _, _, _, _, planned, _ in player_rows}
-        tournament.games_played_with_result = {pid: played for pid, _, _, _, _, _, _, played in player_rows}
-
-        tournament.rounds = [[] for _ in range(num_rounds)]
-        c.execute("SELECT round_num, match_num, player1_id, player2_id, hoops1, hoops2 FROM matches WHERE tournament_id=%s ORDER BY round_num, match_num", (tournament_id,))
-        for r, m, p1id, p2id, h1, h2 in c.fetchall():
-            p1 = player_map.get(p1id)
-            p2 = player_map.get(p2id) if p2id != -1 else None
-            if p1 and p2:
-                p1.add_opponent(p2.id)
-                p2.add_opponent(p1.id)
-            match = Match(p1, p2)
-            match.result = (h1, h2)
-            while len(tournament.rounds) <= r:
-                tournament.rounds.append([])
-            if len(tournament.rounds[r]) <= m:
-                tournament.rounds[r].extend([None] * (m - len(tournament.rounds[r]) + 1))
-            tournament.rounds[r][m] = match
-
-        conn.close()
-        return tournament, tname, num_rounds
+        with pooled_connection() as conn:
+            c = conn.cursor()
+            c.execute("SELECT name FROM tournaments WHERE id=%s", (tournament_id,))
+            tname = c.fetchone()
+            if not tname: return None, None, None
+            tname = tname[0]
+
+            c.execute("SELECT player_id, name, points, wins, hoops_scored, hoops_conceded, planned_games, played_results FROM players WHERE tournament_id=%s ORDER BY player_id", (tournament_id,))
+            player_rows = c.fetchall()
+            player_map = {}
+            for pid, name, pts, wins, hs, hc, planned, played in player_rows:
+                p = Player(pid, name)
+                p.points = pts; p.wins = wins; p.hoops_scored = hs; p.hoops_conceded = hc
+                player_map[pid] = p
+
+            c.execute("SELECT round_num, match_num, player1_id, player2_id, hoops1, hoops2 FROM matches WHERE tournament_id=%s ORDER BY round_num, match_num", (tournament_id,))
+            match_rows = c.fetchall()
+            # Rows are ordered by round, so the last one carries MAX(round_num).
+            num_rounds = (match_rows[-1][0] + 1) if match_rows else 1
+
+            tournament = SwissTournament(list(player_map.values()), num_rounds, schedule=False)
+            tournament.planned_games = {pid: planned for pid, _, _, _, _, _, planned, _ in player_rows}
+            tournament.games_played_with_result = {pid: played for pid, _, _, _, _, _, _, played in player_rows}
+
+            tournament.rounds = [[] for _ in range(num_rounds)]
+            for r, m, p1id, p2id, h1, h2 in match_rows:
+                p1 = player_map.get(p1id)
+                p2 = player_map.get(p2id) if p2id != -1 else None
+                match = Match(p1, p2)
+                match.result = (h1, h2)
+                if len(tournament.rounds[r]) <= m:
+                    tournament.rounds[r].extend([None] * (m - len(tournament.rounds[r]) + 1))
+                tournament.rounds[r][m] = match
+
+            return tournament, tname, num_rounds
     except Exception as e:
         logger.error(f"Load tournament error: {e}")
         st.error(f"Load tournament error: {e}")
         return None, None, None
-    finally:
-        conn.close()
 
 # --------------------------------------------------------------------------- #
-# Single-digit input (0-7) – REAL-TIME VALIDATION + ERROR
+# Single-digit input (0-7) – validated when the score form is submitted
 # --------------------------------------------------------------------------- #
-def _sync_text_to_int(text_key, int_key, mn, mx):
-    raw = st.session_state.get(text_key, "")
+def _parse_score(raw):
     raw = raw.strip()
     if raw == "":
-        st.session_state[int_key] = 0
-        return
+        return 0
     try:
-        v = int(raw)
-        if not (mn <= v <= mx):
-            st.error(f"Score must be {mn}–{mx}")
-            v = max(mn, min(mx, v))
-        st.session_state[int_key] = v
-    except ValueError:
-        st.error("Enter a number")
-        st.session_state[int_key] = 0
+        return int(raw)
+    except ValueError:   # e.g. "x" or "²"
+        return -1        # -1 never passes validation
 
 def number_input_simple(key, min_value=0, max_value=7, label=" ", disabled=False):
     txt = f"{key}_txt"
@@ -456,12 +513,47 @@ def number_input_simple(key, min_value=0, max_value=7, label=" ", disabled=False
         max_chars=1,
         disabled=disabled,
         help="0–7",
-        on_change=_sync_text_to_int,
-        args=(txt, val, min_value, max_value),
         label_visibility="collapsed"
     )
-    
-    return int(st.session_state[val])
+
+def _submit_scores(mn=0, mx=7):
+    tournament = st.session_state.tournament
+    keys = st.session_state.score_keys
+    if not keys:
+        return
+    scores = np.array([
+        (_parse_score(st.session_state.get(f"{k1}_txt", "")),
+         _parse_score(st.session_state.get(f"{k2}_txt", "")))
+        for _, _, k1, k2 in keys
+    ])
+    s1, s2 = scores[:, 0], scores[:, 1]
+    # A row is valid when both scores are in range and it is not a tie
+    # (0–0 means "not played yet"). Every bad row is reported at once.
+    valid = ((scores >= mn) & (scores <= mx)).all(axis=1) & ((s1 != s2) | (s1 == 0))
+    bad = np.flatnonzero(~valid)
+    if bad.size:
+        st.error(f"Scores must be {mn}–{mx} and ties are not allowed – not applied: " +
+                 ", ".join(f"Round {keys[i][0] + 1} match {keys[i][1] + 1}" for i in bad))
+
+    # Diff against the applied scores in one pass; a submit that changes
+    # nothing never reaches the per-row loop.
+    applied = np.array([(st.session_state[f"{k1}_val"], st.session_state[f"{k2}_val"])
+                        for _, _, k1, k2 in keys])
+    changed = np.flatnonzero(valid & (scores != applied).any(axis=1))
+    for i in changed:
+        r, m, k1, k2 = keys[i]
+        new = (int(s1[i]), int(s2[i]))
+        st.session_state[f"{k1}_val"], st.session_state[f"{k2}_val"] = new
+        tournament.record_result(r, m, *new)
+
+def _recalculate_standings():
+    # Runs as the button callback, before the rerun renders the standings,
+    # so no second st.rerun() is needed to show the rebuilt table.
+    st.session_state.tournament.recalculate(
+        (r, m_idx, st.session_state.get(f"{k1}_val", 0), st.session_state.get(f"{k2}_val", 0))
+        for r, m_idx, k1, k2 in st.session_state.score_keys
+    )
+    st.success("Standings recalculated!")
 
 # --------------------------------------------------------------------------- #
 # UI helpers
@@ -479,12 +571,31 @@ def load_selected_tournament(tid):
         if k.startswith(("hoops1_", "hoops2_")):
             del st.session_state[k]
     st.session_state.tournament = tournament
+    st.session_state.score_keys = None
     st.session_state.tournament_name = name
     st.session_state.num_rounds = rounds
     st.session_state.players = [p.name for p in tournament.players]
     st.session_state.loaded_id = tid
     st.success(f"Loaded **{name}**")
 
+def standings_frame(tournament):
+    # Rows come in get_standings() order, the same ranking save_to_db stores.
+    players = tournament.get_standings()
+    played = np.array([tournament.games_played_with_result.get(p.id, 0) for p in players])
+    df = pd.DataFrame({
+        "Name":     [p.name for p in players],
+        "Wins":     [p.wins for p in players],
+        "Points":   [p.points for p in players],
+        "Scored":   [p.hoops_scored for p in players],
+        "Conceded": [p.hoops_conceded for p in players],
+        "Planned":  [tournament.planned_games.get(p.id, 0) for p in players],
+        "Played":   played,
+    })
+    df.insert(3, "Net", df["Scored"] - df["Conceded"])
+    df["Win %"] = np.where(played > 0, df["Wins"] / np.maximum(played, 1) * 100, 0.0).round(1)
+    df.insert(0, "Rank", df.index + 1)
+    return df
+
 def handle_lock_change():
     st.session_state._lock_changed = True
 
@@ -569,9 +680,7 @@ def main():
 
     # --- Ensure DB schema ------------------------------------------------
     try:
-        conn = get_connection()
-        init_schema(conn)
-        conn.close()
+        ensure_schema()
     except Exception as e:
         st.error(f"Failed to initialise database: {e}")
         st.stop()
@@ -581,7 +690,7 @@ def main():
         "tournament": None, "tournament_name": "New Tournament",
         "players": [], "num_rounds": 3, "loaded_id": None,
         "is_locked": "Unlocked", "_lock_changed": False,
-        "score_keys": None
+        "score_keys": None, "standings_cache": None
     }
     for k, v in defaults.items():
         if k not in st.session_state:
@@ -606,10 +715,15 @@ def main():
 
         st.header("Load Saved Tournament")
         if st.button("Refresh list"):
-            st.cache_data.clear()
+            load_tournaments_list.clear()
             st.rerun()
 
-        tour_list = load_tournaments_list(get_db_mtime())
+        try:
+            tour_list = load_tournaments_list()
+        except Exception as e:
+            logger.error(f"Load list error: {e}")
+            st.error(f"Load list error: {e}")
+            tour_list = []
         options = ["--- New Tournament ---"] + [t[1] for t in tour_list]
         id_map = {t[1]: t[0] for t in tour_list}
         default_idx = next((i + 1 for i, (tid, _) in enumerate(tour_list) if tid == st.session_state.loaded_id), 0)
@@ -658,11 +772,12 @@ def main():
 
             player_count = len([p for p in players_txt.splitlines() if p.strip()])
             if player_count >= 2:
-                rec = player_count - 1
                 if player_count % 2 == 0:
+                    rec = player_count - 1
                     st.markdown(f"**Perfect**: Play **{rec} rounds** → everyone plays everyone once.")
                 else:
-                    st.markdown(f"**Recommended**: Play **{rec} rounds** → everyone plays **{rec} games**, **1 bye each**.")
+                    rec = player_count
+                    st.markdown(f"**Recommended**: Play **{rec} rounds** → everyone plays **{rec - 1} games**, **1 bye each**.")
 
             if st.form_submit_button("Create", disabled=st.session_state.is_locked == "Locked"):
                 new_players = [p.strip() for p in players_txt.splitlines() if p.strip()]
@@ -676,8 +791,9 @@ def main():
                     st.session_state.tournament = SwissTournament(new_players, st.session_state.num_rounds)
                     st.session_state.loaded_id = None
                     st.session_state.score_keys = None
+                    # No st.rerun(): the rest of this run already renders the
+                    # new tournament below, and the message stays visible.
                     st.success("Tournament ready – scroll down to enter scores")
-                    st.rerun()
 
     # --------------------------------------------------------------- #
     # ACTIVE TOURNAMENT – **everything that uses `tournament` is here**
@@ -705,68 +821,72 @@ def main():
                     if f"{k2}_val" not in st.session_state:
                         st.session_state[f"{k2}_val"] = v2
                     st.session_state.score_keys.append((r, m, k1, k2))
+        # Per round, everything the render loop needs for each real match:
+        # the match, its widget keys and the two name labels. Fixed for the
+        # tournament, so it is built here once instead of re-filtering the
+        # pairings and formatting labels on every render.
+        name_html = '<div class="player-name"><strong>{}</strong></div>'.format
+        st.session_state.score_rounds = [[] for _ in range(tournament.num_rounds)]
+        for r, m, k1, k2 in st.session_state.score_keys:
+            match = tournament.rounds[r][m]
+            st.session_state.score_rounds[r].append(
+                (match, k1, k2, name_html(match.player1.name), name_html(match.player2.name)))
 
     # --------------------------------------------------------------- #
-    # RENDER ROUNDS – 2 per row, live sync
+    # RENDER ROUNDS – 2 per row, applied on submit
     # --------------------------------------------------------------- #
     st.subheader("Rounds")
 
-    for r in range(tournament.num_rounds):
-        pairings = tournament.get_round_pairings(r)
-        real_matches = [m for m in pairings if m and m.player2]
-        complete = all(sum(m.get_scores()) > 0 for m in real_matches)
-        label = f"Round {r+1} – {len(real_matches)} matches"
-
-        with st.expander(label, expanded=not complete):
-            match_no = 1
-            for i in range(0, len(real_matches), 2):
-                batch = real_matches[i:i+2]
-                cols = st.columns(2)
-
-                for idx, match in enumerate(batch):
-                    entry = next((e for e in st.session_state.score_keys
-                                 if e[0] == r and e[1] == pairings.index(match)), None)
-                    if not entry:
-                        continue
-                    _, _, k1, k2 = entry
-
-                    live1 = int(st.session_state.get(f"{k1}_val", 0))
-                    live2 = int(st.session_state.get(f"{k2}_val", 0))
-
-                    with cols[idx]:
-                        n, p1, h1, h2, p2, stat = st.columns([0.3, 1.2, 0.6, 0.6, 1.2, 0.9])
-
-                        with n: st.write(f"**{match_no}**")
-                        with p1: st.markdown(f'<div class="player-name"><strong>{match.player1.name}</strong></div>', unsafe_allow_html=True)
-
-                        with h1:
-                            new1 = number_input_simple(k1, label=" ", disabled=locked)
-                            if new1 != live1:
-                                tournament.record_result(r, pairings.index(match), new1, live2)
-
-                        with h2:
-                            new2 = number_input_simple(k2, label=" ", disabled=locked)
-                            if new2 != live2:
-                                tournament.record_result(r, pairings.index(match), live1, new2)
-
-                        with p2: st.markdown(f'<div class="player-name"><strong>{match.player2.name}</strong></div>', unsafe_allow_html=True)
-
-                        if live1 == live2 and live1 != 0:
-                            st.error("Ties are not allowed!")
-
-                        with stat:
-                            if live1 == live2 == 0:
-                                st.write("–")
-                            else:
-                                winner = "P1" if live1 > live2 else "P2"
-                                st.markdown(
-                                    f'<div class="result-metric"><strong>{live1}–{live2}</strong><br><small>{winner}</small></div>',
-                                    unsafe_allow_html=True
-                                )
-                    match_no += 1
-
-        if complete:
-            st.success(f"**Round {r+1} complete**")
+    with st.form("score_form", clear_on_submit=False):
+        for r, real_matches in enumerate(st.session_state.score_rounds):
+            complete = all(sum(m.get_scores()) > 0 for m, *_ in real_matches)
+            label = f"Round {r+1} – {len(real_matches)} matches"
+
+            with st.expander(label, expanded=not complete):
+                match_no = 1
+                for i in range(0, len(real_matches), 2):
+                    batch = real_matches[i:i+2]
+                    cols = st.columns(2)
+
+                    for idx, (_, k1, k2, name1, name2) in enumerate(batch):
+
+                        # *_val only ever holds ints (from get_scores or
+                        # _submit_scores), so no coercion is needed here.
+                        live1 = st.session_state.get(f"{k1}_val", 0)
+                        live2 = st.session_state.get(f"{k2}_val", 0)
+
+                        with cols[idx]:
+                            n, p1, h1, h2, p2, stat = st.columns([0.3, 1.2, 0.6, 0.6, 1.2, 0.9])
+
+                            with n: st.write(f"**{match_no}**")
+                            with p1: st.markdown(name1, unsafe_allow_html=True)
+
+                            with h1:
+                                number_input_simple(k1, label=" ", disabled=locked)
+
+                            with h2:
+                                number_input_simple(k2, label=" ", disabled=locked)
+
+                            with p2: st.markdown(name2, unsafe_allow_html=True)
+
+                            if live1 == live2 and live1 != 0:
+                                st.error("Ties are not allowed!")
+
+                            with stat:
+                                if live1 == live2 == 0:
+                                    st.write("–")
+                                else:
+                                    winner = "P1" if live1 > live2 else "P2"
+                                    st.markdown(
+                                        f'<div class="result-metric"><strong>{live1}–{live2}</strong><br><small>{winner}</small></div>',
+                                        unsafe_allow_html=True
+                                    )
+                        match_no += 1
+
+            if complete:
+                st.success(f"**Round {r+1} complete**")
+
+        st.form_submit_button("Update Scores & Standings", disabled=locked, on_click=_submit_scores)
 
     # --------------------------------------------------------------- #
     # RECALCULATE STANDINGS
@@ -775,53 +895,26 @@ def main():
     with st.container():
         col1, col2 = st.columns([1, 3])
         with col1:
-            recalc = st.button("Recalculate Standings", disabled=locked, use_container_width=True)
+            st.button("Recalculate Standings", disabled=locked, use_container_width=True,
+                      on_click=_recalculate_standings)
         with col2:
             st.write("")
 
-        if recalc:
-            # reset player stats
-            for p in tournament.players:
-                p.points = p.wins = p.hoops_scored = p.hoops_conceded = 0
-            tournament.games_played_with_result = {p.id: 0 for p in tournament.players}
-
-            # apply every stored score
-            for r, m_idx, k1, k2 in st.session_state.score_keys:
-                match = tournament.get_round_pairings(r)[m_idx]
-                if not match or not match.player2:
-                    continue
-                h1 = st.session_state.get(f"{k1}_val", 0)
-                h2 = st.session_state.get(f"{k2}_val", 0)
-                match.result = None
-                match.set_result(h1, h2)
-                if h1 > 0 or h2 > 0:
-                    tournament.games_played_with_result[match.player1.id] += 1
-                    tournament.games_played_with_result[match.player2.id] += 1
-
-            st.success("Standings recalculated!")
-            st.rerun()
-
     # --------------------------------------------------------------- #
     # STANDINGS
     # --------------------------------------------------------------- #
     st.markdown("---")
     st.subheader("Current Standings")
-    standings = tournament.get_standings()
-    df = pd.DataFrame([{
-        "Rank": i+1,
-        "Name": p.name,
-        "Wins": p.wins,
-        "Points": p.points,
-        "Net": p.hoops_scored - p.hoops_conceded,
-        "Scored": p.hoops_scored,
-        "Conceded": p.hoops_conceded,
-        "Planned": tournament.planned_games.get(p.id, 0),
-        "Played": tournament.games_played_with_result.get(p.id, 0),
-        "Win %": f"{(p.wins / tournament.games_played_with_result.get(p.id, 0) * 100):.1f}%" 
-                 if tournament.games_played_with_result.get(p.id, 0) > 0 else "0.0%"
-    } for i, p in enumerate(standings)])
-
-    st.dataframe(df, use_container_width=True, hide_index=True)
+    # Rebuild the frame only when a result changed since the last render.
+    cached = st.session_state.standings_cache
+    if cached and cached[0] is tournament and cached[1] == tournament.version:
+        df = cached[2]
+    else:
+        df = standings_frame(tournament)
+        st.session_state.standings_cache = (tournament, tournament.version, df)
+
+    st.dataframe(df, use_container_width=True, hide_index=True,
+                 column_config={"Win %": st.column_config.NumberColumn(format="%.1f%%")})
 
     # --------------------------------------------------------------- #
     # SAVE / EXPORT
@@ -840,17 +933,15 @@ def main():
         if st.button("CSV"):
             f = export_to_csv(tournament, st.session_state.tournament_name)
             if f:
-                with open(f, "rb") as fp:
-                    st.download_button("Download CSV", fp, f, mime="text/csv")
-                os.remove(f)
+                fn, data = f
+                st.download_button("Download CSV", data, fn, mime="text/csv")
     with c3:
         if st.button("Excel"):
             f = export_to_excel(tournament, st.session_state.tournament_name)
             if f:
-                with open(f, "rb") as fp:
-                    st.download_button("Download Excel", fp, f,
-                                      mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-                os.remove(f)
+                fn, data = f
+                st.download_button("Download Excel", data, fn,
+                                  mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
 
 # --------------------------------------------------------------------------- #
 # Export helpers
@@ -859,16 +950,20 @@ def export_to_csv(tournament, name):
     try:
         ts = datetime.now().strftime("%Y%m%d_%H%M%S")
         fn = f"{name}_{ts}.csv"
-        with open(fn, "w", newline="") as f:
-            w = csv.writer(f)
-            w.writerow(["Round", "Match", "P1", "P2", "H1", "H2"])
-            for r, rnd in enumerate(tournament.rounds):
-                for m, match in enumerate(rnd):
-                    if not match: continue
-                    p2 = match.player2.name if match.player2 else "BYE"
-                    h1, h2 = match.get_scores()
-                    w.writerow([r+1, m+1, match.player1.name, p2, h1, h2])
-        return fn
+        # Built in memory like the Excel export – no temp file to write,
+        # read back and remove.
+        buf = io.StringIO(newline="")
+        w = csv.writer(buf)
+        w.writerow(["Round", "Match", "P1", "P2", "H1", "H2"])
+        # writerows loops in C over the generator – no per-row call.
+        w.writerows(
+            (r+1, m+1, match.player1.name,
+             match.player2.name if match.player2 else "BYE",
+             *match.get_scores())
+            for r, rnd in enumerate(tournament.rounds)
+            for m, match in enumerate(rnd) if match
+        )
+        return fn, buf.getvalue().encode("utf-8")
     except Exception as e:
         logger.error(f"CSV error: {e}")
         st.error(f"CSV error: {e}")
@@ -878,16 +973,22 @@ def export_to_excel(tournament, name):
     try:
         ts = datetime.now().strftime("%Y%m%d_%H%M%S")
         fn = f"{name}_{ts}.xlsx"
-        rows = []
+        buf = io.BytesIO()
+        # Rows go straight to the sheet – no DataFrame in between.
+        wb = xlsxwriter.Workbook(buf, {"in_memory": True})
+        ws = wb.add_worksheet()
+        ws.write_row(0, 0, ["Round", "Match", "Player 1", "Player 2", "Hoops 1", "Hoops 2"],
+                     wb.add_format({"bold": True, "border": 1, "align": "center"}))
+        row = 1
         for r, rnd in enumerate(tournament.rounds):
             for m, match in enumerate(rnd):
                 if not match: continue
-                p2 = match.player2.name if match.player2 else "BYE"
-                h1, h2 = match.get_scores()
-                rows.append({"Round": r+1, "Match": m+1, "Player 1": match.player1.name,
-                             "Player 2": p2, "Hoops 1": h1, "Hoops 2": h2})
-        pd.DataFrame(rows).to_excel(fn, index=False)
-        return fn
+                ws.write_row(row, 0, (r+1, m+1, match.player1.name,
+                                      match.player2.name if match.player2 else "BYE",
+                                      *match.get_scores()))
+                row += 1
+        wb.close()
+        return fn, buf.getvalue()
     except Exception as e:
         logger.error(f"Excel error: {e}")
         st.error(f"Excel error: {e}")
@@ -0,0 +1,40 @@
+import itertools
+from collections import Counter
+
+import pytest
+
+from croquet_app import _pairing_schedule
+
+
+def _check_round(rnd, n):
+    seated = sorted(p for pair in rnd for p in pair if p is not None)
+    assert seated == list(range(n)), "every player is seated exactly once"
+    assert sum(1 for _, j in rnd if j is None) == n % 2
+
+
+@pytest.mark.parametrize("n", range(2, 25))
+def test_full_round_robin(n):
+    num_rounds = n - 1 + n % 2
+    schedule = _pairing_schedule(n, num_rounds)
+    assert len(schedule) == num_rounds
+    for rnd in schedule:
+        _check_round(rnd, n)
+    met = sorted(pair for rnd in schedule for pair in rnd if pair[1] is not None)
+    assert met == list(itertools.combinations(range(n), 2))
+    if n % 2:
+        byes = Counter(i for rnd in schedule for i, j in rnd if j is None)
+        assert byes == Counter(range(n))
+
+
+@pytest.mark.parametrize("n", range(2, 25))
+def test_partial_schedule_has_no_rematches(n):
+    num_rounds = max(1, (n - 1) // 2)
+    schedule = _pairing_schedule(n, num_rounds)
+    for rnd in schedule:
+        _check_round(rnd, n)
+    met = [pair for rnd in schedule for pair in rnd if pair[1] is not None]
+    assert len(met) == len(set(met))
+
+
+def test_extra_rounds_are_empty():
+    assert _pairing_schedule(4, 5)[3:] == ((), ())